@@ -2,13 +2,36 @@
 
 # Third-party imports
 import streamlit as st
-import pandas as pd
 
 # Local application imports
 from buggy_tasks.commands import process_command, registry
-from buggy_tasks.io import load_todos, save_todos
+from buggy_tasks.store import TodoSnapshot, TodoStore, get_shared_store, thaw_todos
 from buggy_tasks.derive_tags import derive_tags_from_text
-from buggy_tasks.priority import compute_priority
+from buggy_tasks.priority import DEFAULT_PRIORITY, compute_priority, get_model_version
+from buggy_tasks.rescoring import PriorityRescorer
+
+# Number of table rows visible without scrolling; these are re-scored first
+VISIBLE_TABLE_ROWS = 10
+
+
+def get_todo_store() -> TodoStore:
+    """Get the todo store shared by all sessions of this process, loading it on first use"""
+    return get_shared_store()
+
+
+@st.cache_resource
+def get_priority_rescorer() -> PriorityRescorer:
+    """Get the rescorer keeping the shared todo store's priorities up to date with the model"""
+    return PriorityRescorer(get_todo_store())
+
+
+def sync_todos() -> None:
+    """Point the session at the latest shared snapshot of the todo list"""
+    snapshot = get_todo_store().snapshot
+    # Sessions only hold a reference to the shared, read-only snapshot
+    st.session_state.todos = snapshot.todos
+    st.session_state.todos_version = snapshot.version
+
 
 # Initialize session state variables
 # This ensures we have defaults for all required state
@@ -17,7 +40,7 @@ from buggy_tasks.priority import compute_priority
 def initialize_session_state():
     """Initialize the session state with default values if they don't exist"""
     if "todos" not in st.session_state:
-        st.session_state.todos = []
+        sync_todos()
     if "new_todo" not in st.session_state:
         st.session_state.new_todo = ""
 
@@ -34,7 +57,7 @@ def add_todo():
     1. Applies any slash commands
     2. Derives tags using AI
     3. Calculates priority
-    4. Adds the todo to the session state
+    4. Adds the todo to the shared todo store
     5. Saves the updated todo list
     """
     # Check if there is actually a todo to add
@@ -45,30 +68,62 @@ def add_todo():
         # Step 2: Derive tags using AI
         tags = derive_tags_from_text(processed_text)
 
-        # Step 3: Calculate priority score based on tags
-        priority_score = compute_priority(tags)
+        # Step 3: Calculate priority score based on tags, remembering which model scored it
+        model_version = get_model_version()
+        try:
+            priority_score = compute_priority(tags)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"Error computing priority: {e}")
+            # Use a default priority without a model version, so the rescorer scores it later
+            priority_score = DEFAULT_PRIORITY
+            model_version = None
 
         # Step 4: Create and add the new todo item
         todo_item = {
             "task": processed_text,
             "completed": False,
             "tags": tags,
-            "priority": priority_score
+            "priority": priority_score,
+            "priority_model": model_version
         }
-        # Insert at the beginning of the list (newest first)
-        st.session_state.todos.insert(0, todo_item)
+        # Insert at the beginning of the latest list (newest first); this also saves it
+        get_todo_store().update(lambda todos: [todo_item, *todos])
 
-        # Step 5: Save and reset input
-        save_todos(st.session_state.todos)
+        # Step 5: Pick up the new version and reset input
+        sync_todos()
         st.session_state.new_todo = ""
 
 
 def clear_todos():
-    """Remove all todos from the session state and save the empty list"""
-    # Reset the todos list
-    st.session_state.todos = []
-    # Make sure to persist the change to storage
-    save_todos(st.session_state.todos)
+    """Remove all todos from the shared store and save the empty list"""
+    # Reset the todos list; the store persists the change to storage
+    get_todo_store().update(lambda todos: [])
+    sync_todos()
+
+
+def mark_table_edited() -> None:
+    """Remember that the todo table was edited, until its edits are read"""
+    st.session_state.table_edited = True
+
+
+def merge_todo_changes(changes: dict) -> None:
+    """
+    Save table edits made to the session's snapshot into the latest shared todo list.
+
+    Args:
+        changes: New todo for each edited row index, or None for deleted rows
+    """
+    base = TodoSnapshot(version=st.session_state.todos_version, todos=st.session_state.todos)
+    _, conflicts = get_todo_store().merge(base, changes)
+    if conflicts:
+        # Another session changed or deleted these todos first; shown after the rerun
+        conflicting_tasks = ", ".join(f"'{base.todos[row]['task']}'" for row in conflicts)
+        st.session_state.merge_warning = (
+            f"Your changes to {conflicting_tasks} were not saved, because the todo was changed "
+            "or deleted in another session.")
+    sync_todos()
 
 
 def insert_command_example(example: str) -> None:
@@ -81,6 +136,22 @@ def insert_command_example(example: str) -> None:
     st.session_state.new_todo = example
 
 
+@st.fragment(run_every=1)
+def display_rescoring_progress():
+    """
+    Show the progress of re-scoring todos after the priority model was retrained.
+
+    Only drawn while re-scoring runs: once it is done, the whole app reruns
+    without this fragment, which also stops it from polling.
+    """
+    progress = get_priority_rescorer().progress
+    if progress.running:
+        st.progress(progress.fraction, text=f"Updating priorities for the new model: {progress.done}/{progress.total}")
+    else:
+        # Re-scoring finished; show the new priorities
+        st.rerun()
+
+
 def display_todos_with_data_editor():
     """Display todos in an editable data table using Streamlit's data_editor"""
     # Transform todo dictionaries to a format suitable for display
@@ -95,6 +166,9 @@ def display_todos_with_data_editor():
         }
         todo_display_data.append(display_record)
 
+    # Deferred import: pandas is only needed once there are todos to show
+    import pandas as pd
+
     # Create pandas DataFrame from the display data
     todo_df = pd.DataFrame(todo_display_data)
 
@@ -106,9 +180,11 @@ def display_todos_with_data_editor():
     todo_df = todo_df[column_order]
 
     # Use st.data_editor for an editable table
+    # One editor per version of the list, so edits are never replayed onto a newer version
     edited_df = st.data_editor(
         todo_df,
-        key="data_editor",
+        key=f"data_editor_{st.session_state.todos_version}",
+        on_change=mark_table_edited,
         hide_index=True,
         column_config={
             "Completed": st.column_config.CheckboxColumn("Completed"),
@@ -118,46 +194,52 @@ def display_todos_with_data_editor():
         },
     )
 
-    # Process any rows marked for deletion
-    rows_marked_for_deletion = edited_df[edited_df["Delete"]].index
-    # Check if any rows need to be deleted
-    if not rows_marked_for_deletion.empty:
-        # Filter out the todos that should be deleted using list comprehension
-        indices_to_delete = [i - 1 for i in rows_marked_for_deletion]
-        st.session_state.todos = [
-            todo for i, todo in enumerate(st.session_state.todos) if i not in indices_to_delete
-        ]
-        # Persist changes to storage
-        save_todos(st.session_state.todos)
-        # Refresh the UI to reflect changes
-        st.rerun()
+    # The edits are read now; later reruns may move to a newer version again
+    st.session_state.table_edited = False
 
-    # Apply any edits made in the data editor to our todos list
-    updated_todos_list = []
+    # Collect the rows marked for deletion and the rows edited in the data editor
+    base_todos = thaw_todos(st.session_state.todos)
+    changes = {}
     # Process each row in the edited dataframe
     for idx, data_row in edited_df.iterrows():
-        # Create a new todo item with the edited values
+        if data_row["Delete"]:
+            changes[idx] = None
+            continue
+
+        # Create a new todo item with the edited values, keeping fields the table does not show
         updated_todo = {
+            **base_todos[idx],
             "task": data_row["Task"],
             "completed": data_row["Completed"],
             # Split comma-separated tags string back into a list, stripping whitespace
             "tags": [tag.strip() for tag in data_row["Tags"].split(",") if tag.strip()],
             "priority": data_row["Priority"],
         }
-        # Add to our updated list
-        updated_todos_list.append(updated_todo)
-
-    st.session_state.todos = updated_todos_list
-    save_todos(st.session_state.todos)
+        # Edited tags invalidate the priority; the rescorer computes a new one
+        if updated_todo["tags"] != base_todos[idx]["tags"]:
+            updated_todo["priority_model"] = None
+        # Only rows that were actually edited are saved
+        if updated_todo != base_todos[idx]:
+            changes[idx] = updated_todo
+
+    if changes:
+        # Persist changes to storage, merged into the latest version
+        merge_todo_changes(changes)
+        # Refresh the UI to reflect changes
+        st.rerun()
 
 
 # Application title with emoji
 st.title("✨ Buggy Tasks - To Do List ✨")
 
-# Load saved todos from storage on application startup
-if not st.session_state.todos:
-    # If no todos in session state, load them from persistent storage
-    st.session_state.todos = load_todos()
+# Move this session to the latest version of the shared todo list, unless the
+# table was edited: its edits refer to the version it showed, and the editor
+# drops them if it is drawn with different data
+if not st.session_state.get("table_edited", False):
+    sync_todos()
+
+# Re-score todos left over from an older priority model in the background
+get_priority_rescorer().ensure_current(visible_rows=VISIBLE_TABLE_ROWS)
 
 # Create a form for adding new todos with a modern UI
 with st.form(key="add_todo_form", clear_on_submit=False):
@@ -210,6 +292,10 @@ with st.expander("Commands 🚀"):
 # Display todos section header with icon
 st.subheader("📋 My Todos")
 
+# Explain edits that could not be merged in the previous run, even if the list is empty now
+if "merge_warning" in st.session_state:
+    st.warning(st.session_state.pop("merge_warning"))
+
 # Handle empty state vs. populated state
 if not st.session_state.todos:
     # Show a friendly message when no todos exist
@@ -222,6 +308,10 @@ if not st.session_state.todos:
         unsafe_allow_html=True
     )
 else:
+    # Show re-scoring progress above the table while priorities are being updated
+    if get_priority_rescorer().progress.running:
+        display_rescoring_progress()
+
     # Display the interactive todo table
     display_todos_with_data_editor()
 
@@ -4,13 +4,32 @@ Command Registry System
 This module provides a registry system for slash commands used in the todo application.
 Commands are registered with a name, description, and example, and can be executed
 with arguments.
+
+Built-in commands are registered lazily by import path, so their modules (and
+heavy dependencies such as googletrans) are only loaded when first executed.
+
+Commands may be plain functions or coroutine functions. Coroutines run on a
+single event loop shared by all sessions. Every command runs with a timeout,
+and commands declared as pure have their results memoized by arguments.
 """
 
-from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Union
+import asyncio
+import importlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+# Default maximum time in seconds a command may take
+DEFAULT_COMMAND_TIMEOUT = 30.0
 
-# Import available command implementations
-from .translate import translate
+# Maximum number of memoized results of pure commands
+RESULT_CACHE_SIZE = 256
+
+
+class CommandTimeoutError(TimeoutError):
+    """Raised when a command does not finish within its timeout"""
 
 
 @dataclass(frozen=True)
@@ -19,8 +38,40 @@ class CommandInfo:
     name: str
     description: str
     example: str
-    func: Callable
+    func: Optional[Callable] = None
     enabled: bool = field(default=True)
+    # "module:attribute" path used to load func on first execution
+    import_path: Optional[str] = None
+    # Maximum time in seconds the command may take (None waits forever)
+    timeout: Optional[float] = DEFAULT_COMMAND_TIMEOUT
+    # Pure commands always return the same result for the same arguments
+    pure: bool = False
+
+
+class _EventLoopThread:
+    """Event loop running on a daemon thread, started on first use"""
+
+    def __init__(self):
+        """Initialize without starting the loop."""
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the shared event loop, starting its thread if needed.
+
+        Returns:
+            The running event loop
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="buggy-tasks-commands",
+                    daemon=True
+                ).start()
+            return self._loop
 
 
 class CommandRegistry:
@@ -34,8 +85,15 @@ class CommandRegistry:
         """Initialize an empty command registry."""
         # Storage for registered commands
         self.commands: Dict[str, CommandInfo] = {}
-
-    def register(self, name: str, description: str, example: str) -> Callable:
+        # Shared loop for async commands and worker threads for sync commands with a timeout
+        self._event_loop = _EventLoopThread()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="buggy-tasks-commands")
+        # Memoized results of pure commands, keyed by (name, args), least recently used first
+        self._results: "OrderedDict[Tuple[str, Tuple[Any, ...]], Any]" = OrderedDict()
+        self._results_lock = threading.Lock()
+
+    def register(self, name: str, description: str, example: str,
+                 timeout: Optional[float] = DEFAULT_COMMAND_TIMEOUT, pure: bool = False) -> Callable:
         """
         Decorator that registers a function as a command.
 
@@ -43,6 +101,8 @@ class CommandRegistry:
             name: Command name (without slash)
             description: Human-readable description of what the command does
             example: Example usage of the command
+            timeout: Maximum time in seconds the command may take (None waits forever)
+            pure: Whether results may be memoized by arguments
 
         Returns:
             Decorator function that registers the command
@@ -53,13 +113,58 @@ class CommandRegistry:
                 name=name,
                 description=description,
                 example=example,
-                func=func
+                func=func,
+                timeout=timeout,
+                pure=pure
             )
             # Return the original function unchanged
             return func
 
         return decorator
 
+    def register_lazy(self, name: str, description: str, example: str, import_path: str,
+                      timeout: Optional[float] = DEFAULT_COMMAND_TIMEOUT, pure: bool = False) -> None:
+        """
+        Register a command whose implementation is imported on first execution.
+
+        Args:
+            name: Command name (without slash)
+            description: Human-readable description of what the command does
+            example: Example usage of the command
+            import_path: Location of the command function as "module:attribute".
+                Relative module names are resolved against this package.
+            timeout: Maximum time in seconds the command may take (None waits forever)
+            pure: Whether results may be memoized by arguments
+        """
+        self.commands[name] = CommandInfo(
+            name=name,
+            description=description,
+            example=example,
+            import_path=import_path,
+            timeout=timeout,
+            pure=pure
+        )
+
+    def _resolve(self, command: str) -> Callable:
+        """
+        Return the function for a command, importing it if it was registered lazily.
+
+        Args:
+            command: Name of a registered command
+
+        Returns:
+            The callable implementing the command
+        """
+        command_info = self.commands[command]
+        if command_info.func is None:
+            # Import the command module now and remember the resolved function
+            module_name, _, attribute_name = command_info.import_path.partition(":")
+            module = importlib.import_module(module_name, package=__package__)
+            command_info = replace(command_info, func=getattr(module, attribute_name))
+            self.commands[command] = command_info
+
+        return command_info.func
+
     def execute(self, command: str, *args: Any) -> str:
         """
         Execute a registered command.
@@ -70,13 +175,63 @@ class CommandRegistry:
 
         Returns:
             Result of the command execution
+
+        Raises:
+            CommandTimeoutError: If the command does not finish within its timeout
         """
         # Check if the command exists
         if command not in self.commands:
             return f"Unknown command: {command}"
 
+        func = self._resolve(command)
+        command_info = self.commands[command]
+
+        # Serve pure commands from the memoized results if possible
+        cache_key = (command, args)
+        if command_info.pure:
+            with self._results_lock:
+                if cache_key in self._results:
+                    self._results.move_to_end(cache_key)
+                    return self._results[cache_key]
+
         # Execute the command with provided arguments
-        return self.commands[command].func(*args)
+        result = self._run(command_info, func, args)
+
+        if command_info.pure:
+            with self._results_lock:
+                self._results[cache_key] = result
+                if len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+
+        return result
+
+    def _run(self, command_info: CommandInfo, func: Callable, args: Tuple[Any, ...]) -> Any:
+        """
+        Run a command function, enforcing its timeout.
+
+        Args:
+            command_info: The registered command
+            func: The resolved command function
+            args: Arguments to pass to the command function
+
+        Returns:
+            Result of the command function
+        """
+        if asyncio.iscoroutinefunction(func):
+            # Async commands share one event loop instead of starting their own
+            future = asyncio.run_coroutine_threadsafe(func(*args), self._event_loop.get_loop())
+        elif command_info.timeout is not None:
+            # Run sync commands on a worker thread so we can stop waiting for them
+            future = self._executor.submit(func, *args)
+        else:
+            return func(*args)
+
+        try:
+            return future.result(timeout=command_info.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise CommandTimeoutError(
+                f"Command '{command_info.name}' timed out after {command_info.timeout}s")
 
     def get_commands(self) -> List[CommandInfo]:
         """
@@ -97,14 +252,17 @@ registry = CommandRegistry()
 # ============================================================
 
 # The translate command - converts text to different languages
-registry.register(
+registry.register_lazy(
     name="translate",
     description="Translate text to a target language using AI",
     example='/translate("Learn how to make pasta", "IT")',
-)(translate)
+    import_path=".translate:translate",
+    timeout=10.0,
+    pure=True,
+)
 
 # Add more commands here as needed
-# registry.register(...)
+# registry.register_lazy(...) or registry.register(...)
 
 # ============================================================
 
@@ -9,16 +9,24 @@ using the Google Translate API via the googletrans library.
 """
 
 # Standard library imports
-import asyncio
 import logging
 from typing import Dict, Optional, Union, Any
 
 # Third-party imports
 from googletrans import Translator, constants
 
+# Local application imports
+from buggy_tasks.scheduler import ProviderUnavailableError, scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Name of the translation provider in the call scheduler
+PROVIDER_NAME = "google-translate"
+
+# Bound how long a /translate command can wait on Google Translate
+scheduler.configure(PROVIDER_NAME, rate_per_second=2.0, burst=5, timeout=5.0)
+
 # Common language codes for reference
 COMMON_LANGUAGES: Dict[str, str] = {
     "EN": "English",
@@ -59,12 +67,13 @@ async def _translate_async(text: str, target_lang: str) -> str:
         return translation_result.text
 
 
-def translate(text: str, target_lang: str) -> str:
+async def translate(text: str, target_lang: str) -> str:
     """
     Translate text to a target language using Google Translate.
 
-    This function provides a synchronous interface to the translation
-    functionality, using asyncio under the hood.
+    This is an async command, run by the command registry on its shared event
+    loop. Requests go through the shared call scheduler, so an unavailable
+    service fails fast.
 
     Args:
         text: The text to translate
@@ -88,10 +97,11 @@ def translate(text: str, target_lang: str) -> str:
     logger.info(f"Translating text to {target_lang.upper()}")
 
     try:
-        # Run the async translation function in a synchronous context
-        translated_text = asyncio.run(_translate_async(text, target_lang))
+        # Run the translation through the scheduler (no fallback: errors are raised)
+        translated_text = await scheduler.call_async(
+            PROVIDER_NAME, (text, target_lang.lower()), _translate_async, text, target_lang)
         return translated_text
-    except Exception as e:
+    except ProviderUnavailableError as e:
         # Log the error and re-raise with a more user-friendly message
         logger.error(f"Translation error: {e}")
         raise RuntimeError(f"Translation service unavailable: {str(e)}")
@@ -5,34 +5,63 @@
 Tag Derivation Module
 
 This module uses the Mistral AI API to automatically derive tags from todo text.
+
+The Mistral client and dotenv are imported on first use rather than at import
+time, so loading this module does not slow down the app's startup.
 """
 
 # Standard library imports
 import os
 import json
 import logging
-from typing import List
+from typing import List, Optional
 
-# Third-party imports
-from dotenv import load_dotenv
-from mistralai import Mistral
+# Local application imports
+from buggy_tasks.scheduler import scheduler
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Configuration
 API_KEY_ENV_VAR = "MISTRAL_API_KEY"
 MODEL_NAME = "mistral-large-latest"
+PROVIDER_NAME = "mistral"
+
+# Bound how long adding a todo can wait on Mistral
+scheduler.configure(PROVIDER_NAME, rate_per_second=1.0, burst=5, timeout=10.0)
+
+# API key, resolved on first use by _get_api_key()
+api_key: Optional[str] = None
+
+
+def _get_api_key() -> str:
+    """
+    Load the Mistral API key from the environment (or .env file) on first use.
+
+    Returns:
+        The API key string
+
+    Raises:
+        ValueError: If the API key environment variable is not set
+    """
+    global api_key
+    if api_key:
+        return api_key
 
-# Get API key from environment
-api_key = os.environ.get(API_KEY_ENV_VAR)
-if not api_key:
-    error_msg = f"{API_KEY_ENV_VAR} environment variable is not set."
-    logger.error(error_msg)
-    raise ValueError(error_msg)
+    # Deferred import: dotenv is only needed once we actually call the API
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Get API key from environment
+    api_key = os.environ.get(API_KEY_ENV_VAR)
+    if not api_key:
+        error_msg = f"{API_KEY_ENV_VAR} environment variable is not set."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    return api_key
 
 
 def derive_tags_from_text(text: str) -> List[str]:
@@ -40,10 +69,41 @@ def derive_tags_from_text(text: str) -> List[str]:
     Derive relevant tags from todo text using Mistral AI.
 
     This function sends the todo text to the Mistral AI API and asks it to 
-    generate relevant tags based on the content.
+    generate relevant tags based on the content. The request goes through the
+    shared call scheduler, so identical concurrent requests are sent once and
+    a failing API falls back to a default tag quickly.
+
+    Args:
+        text: The todo text to analyze
+
+    Returns:
+        A list of tags (strings) derived from the text
+
+    Raises:
+        ValueError: If the MISTRAL_API_KEY environment variable is not set
+    """
+    # Resolve the API key first so a missing key is still reported loudly
+    key = _get_api_key()
+
+    derived_tags = scheduler.call(PROVIDER_NAME, text, _request_tags, text, key, fallback=_default_tags)
+
+    # Coalesced callers share the result, so hand out a copy
+    return list(derived_tags)
+
+
+def _default_tags() -> List[str]:
+    """Fallback tags used when Mistral cannot be reached."""
+    logger.error("Error deriving tags, falling back to default tag")
+    return ["task"]
+
+
+def _request_tags(text: str, key: str) -> List[str]:
+    """
+    Request tags for todo text from the Mistral AI API.
 
     Args:
         text: The todo text to analyze
+        key: Mistral API key
 
     Returns:
         A list of tags (strings) derived from the text
@@ -51,55 +111,52 @@ def derive_tags_from_text(text: str) -> List[str]:
     Raises:
         ValueError: If the API doesn't return valid tags
     """
-    try:
-        # Initialize Mistral client
-        client = Mistral(api_key=api_key)
-
-        # Example format for the expected response
-        json_format_example = "{\"tags\": [\"tag1\", \"tag2\"]}"
-
-        # Define the conversation for the API
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": (
-                    f"You are a helpful assistant that derives tags from TODO list items. "
-                    f"The tags should be relevant to the task. "
-                    f"Examples for tags are 'cleaning', 'work', 'learning', 'health', 'chores', 'family', 'python'. "
-                    f"Return a maximum of 3 tags. "
-                    f"Return JSON that looks like this: {json_format_example}. "
-                    f"Do not include any other text or explanation."
-                ),
-            },
-            {
-                "role": "user",
-                "content": text,
-            }
-        ]
-
-        # Call the API
-        logger.debug(f"Sending text to Mistral API: {text}")
-        chat_response = client.chat.complete(
-            model=MODEL_NAME,
-            messages=prompt_messages,
-            response_format={
-                "type": "json_object",
-            }
-        )
-
-        # Extract tags from the response
-        response_json = json.loads(chat_response.choices[0].message.content)
-        derived_tags = response_json["tags"]
-
-        # Validate the response
-        if not isinstance(derived_tags, list):
-            raise ValueError(
-                f"Expected a list of strings, but got {type(derived_tags)}: {derived_tags}")
-
-        logger.info(f"Derived tags: {derived_tags}")
-        return derived_tags
-
-    except Exception as e:
-        logger.error(f"Error deriving tags: {e}")
-        # Fallback to a default tag in case of error
-        return ["task"]
+    # Deferred import: mistralai is heavy and only needed for this call
+    from mistralai import Mistral
+
+    # Initialize Mistral client
+    client = Mistral(api_key=key)
+
+    # Example format for the expected response
+    json_format_example = "{\"tags\": [\"tag1\", \"tag2\"]}"
+
+    # Define the conversation for the API
+    prompt_messages = [
+        {
+            "role": "system",
+            "content": (
+                f"You are a helpful assistant that derives tags from TODO list items. "
+                f"The tags should be relevant to the task. "
+                f"Examples for tags are 'cleaning', 'work', 'learning', 'health', 'chores', 'family', 'python'. "
+                f"Return a maximum of 3 tags. "
+                f"Return JSON that looks like this: {json_format_example}. "
+                f"Do not include any other text or explanation."
+            ),
+        },
+        {
+            "role": "user",
+            "content": text,
+        }
+    ]
+
+    # Call the API
+    logger.debug(f"Sending text to Mistral API: {text}")
+    chat_response = client.chat.complete(
+        model=MODEL_NAME,
+        messages=prompt_messages,
+        response_format={
+            "type": "json_object",
+        }
+    )
+
+    # Extract tags from the response
+    response_json = json.loads(chat_response.choices[0].message.content)
+    derived_tags = response_json["tags"]
+
+    # Validate the response
+    if not isinstance(derived_tags, list):
+        raise ValueError(
+            f"Expected a list of strings, but got {type(derived_tags)}: {derived_tags}")
+
+    logger.info(f"Derived tags: {derived_tags}")
+    return derived_tags
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup Import-Time Report
+
+This module measures how long the app's own modules take to import at startup.
+It runs a fresh interpreter with ``python -X importtime``, parses the import
+tree and attributes the time to our modules, similar to ``-X importtime`` but
+without the noise of everything else.
+
+Streamlit is imported first as a baseline, since the app cannot start without it.
+Anything it already pulls in is not charged to our modules.
+
+The report doubles as a regression check: it exits with a non-zero status if
+our modules exceed the time budget or eagerly import a dependency that should
+only be loaded on first use (pandas, sklearn, mistralai, ...).
+
+Usage:
+    python -m buggy_tasks.importtime [--budget-ms 50] [--repeat 3]
+"""
+
+# Standard library imports
+import argparse
+import ast
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Constants and configuration
+PACKAGE_NAME = "buggy_tasks"
+PROJECT_DIR = Path(__file__).parent.parent
+APP_PATH = Path(__file__).parent / "app.py"
+
+# Modules the app always needs; imported first and not charged to us
+BASELINE_MODULES = ["streamlit"]
+
+# Heavy dependencies that must only be imported on first actual use
+DEFERRED_PACKAGES = ["pandas", "sklearn", "joblib", "mistralai", "googletrans", "dotenv"]
+
+# Default budget for the total import time of our modules
+DEFAULT_BUDGET_MS = 50.0
+
+
+@dataclass
+class ImportRecord:
+    """A single line of -X importtime output, with the imports it triggered"""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    children: List["ImportRecord"] = field(default_factory=list)
+
+    def walk(self) -> Iterator["ImportRecord"]:
+        """Yield this record and all records below it, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Parse the stderr output of ``python -X importtime`` into import trees.
+
+    The output lists nested imports before the module that triggered them,
+    with indentation marking the nesting level.
+
+    Args:
+        output: Raw stderr text of the interpreter
+
+    Returns:
+        List of top-level import records, in import order
+    """
+    pending: List[ImportRecord] = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        # Format: "import time: <self> | <cumulative> | <indent><name>"
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Header line
+
+        raw_name = parts[2][1:]
+        record = ImportRecord(
+            name=raw_name.strip(),
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(raw_name) - len(raw_name.lstrip())) // 2,
+        )
+
+        # Everything deeper than this record that is still pending was imported by it
+        while pending and pending[-1].depth > record.depth:
+            record.children.insert(0, pending.pop())
+
+        pending.append(record)
+
+    return pending
+
+
+def is_own_module(name: str) -> bool:
+    """Check whether a module name belongs to this package"""
+    return name == PACKAGE_NAME or name.startswith(PACKAGE_NAME + ".")
+
+
+def find_startup_modules(app_path: Path = APP_PATH) -> List[str]:
+    """
+    Find our modules the app imports before its first paint.
+
+    These are the app script's module-level imports, so the report keeps
+    covering them as the app changes. Imports inside functions are deferred
+    and not part of startup.
+
+    Args:
+        app_path: Path of the Streamlit app script
+
+    Returns:
+        Names of our modules imported at module level, in import order
+    """
+    tree = ast.parse(app_path.read_text(), filename=str(app_path))
+
+    modules: List[str] = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if is_own_module(name) and name not in modules)
+
+    return modules
+
+
+def measure_imports(modules: Sequence[str], baseline: Sequence[str] = BASELINE_MODULES) -> List[ImportRecord]:
+    """
+    Import modules in a fresh interpreter and return the resulting import trees.
+
+    Args:
+        modules: Modules to measure
+        baseline: Modules to import first, whose cost is not attributed
+
+    Returns:
+        Top-level import records of our own modules
+    """
+    import_statements = "; ".join(f"import {module}" for module in [*baseline, *modules])
+
+    # Baseline imports run first, so only what they did not import shows up under ours
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", import_statements],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import startup modules:\n{result.stderr[-2000:]}")
+
+    return [record for record in parse_importtime(result.stderr) if is_own_module(record.name)]
+
+
+def find_deferred_imports(records: Sequence[ImportRecord]) -> Dict[str, List[str]]:
+    """
+    Find heavy dependencies that were imported eagerly by our modules.
+
+    Args:
+        records: Import records of our own modules
+
+    Returns:
+        Mapping of our module name to the deferred packages it imported
+    """
+    violations: Dict[str, List[str]] = {}
+    for record in records:
+        for imported in record.walk():
+            package = imported.name.split(".")[0]
+            if package in DEFERRED_PACKAGES and package not in violations.get(record.name, []):
+                violations.setdefault(record.name, []).append(package)
+    return violations
+
+
+def format_report(records: Sequence[ImportRecord], budget_ms: float, top: int = 3) -> str:
+    """
+    Format a per-module import time report.
+
+    Args:
+        records: Import records of our own modules
+        budget_ms: Budget for the total import time of our modules
+        top: Number of largest third-party imports to list per module
+
+    Returns:
+        The report as a printable string
+    """
+    lines = [f"{'module':<30} {'self ms':>9} {'cumulative ms':>14}"]
+
+    for record in records:
+        lines.append(f"{record.name:<30} {record.self_us / 1000:>9.1f} {record.cumulative_us / 1000:>14.1f}")
+
+        # Attribute the rest of the cumulative time to the third-party imports it triggered
+        dependencies = sorted(
+            (child for child in record.children if not is_own_module(child.name)),
+            key=lambda child: child.cumulative_us,
+            reverse=True,
+        )[:top]
+        for dependency in dependencies:
+            lines.append(f"    {dependency.name:<26} {'':>9} {dependency.cumulative_us / 1000:>14.1f}")
+
+    total_ms = sum(record.cumulative_us for record in records) / 1000
+    lines.append(f"Total attributed to {PACKAGE_NAME}: {total_ms:.1f} ms (budget {budget_ms:.1f} ms)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Print the startup import report and check it against the budget.
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code: 0 if within budget, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Report startup import time of buggy_tasks modules")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum total import time of our modules")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of runs; the fastest one is reported")
+    parser.add_argument("modules", nargs="*",
+                        help="Modules to measure (defaults to the ones app.py imports at startup)")
+    args = parser.parse_args(argv)
+    modules = args.modules or find_startup_modules()
+
+    # Import time is noisy, so keep the fastest of several runs
+    runs = [measure_imports(modules) for _ in range(max(1, args.repeat))]
+    records = min(runs, key=lambda run: sum(record.cumulative_us for record in run))
+
+    print(format_report(records, args.budget_ms))
+
+    exit_code = 0
+    for module, imported in find_deferred_imports(records).items():
+        print(f"FAIL: {module} eagerly imports {', '.join(imported)}")
+        exit_code = 1
+
+    total_ms = sum(record.cumulative_us for record in records) / 1000
+    if total_ms > args.budget_ms:
+        print(f"FAIL: startup imports took {total_ms:.1f} ms, budget is {args.budget_ms:.1f} ms")
+        exit_code = 1
+
+    if exit_code == 0:
+        print("OK")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
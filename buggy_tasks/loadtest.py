@@ -0,0 +1,530 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Concurrent-Session Load Test
+
+This module drives many headless sessions of the Streamlit app in parallel using
+Streamlit's AppTest, all sharing one process like a real Streamlit server does.
+Tag derivation and translation are replaced by local stubs, so the test
+measures the app itself rather than the AI providers.
+
+AppTest keeps the Streamlit runtime in a global, so individual reruns are
+serialized while the sessions interleave. Rerun latency is the time a rerun
+takes once it runs; response latency also includes waiting for other sessions.
+
+Each session runs a scripted, seeded workload of add, edit, delete and clear
+operations against a pre-filled todo list. The report contains per-rerun latency
+percentiles, throughput, peak memory and consistency checks on the final store:
+- the saved todos.json matches the shared in-memory snapshot
+- no todo disappeared without a session deleting it or clearing the list
+- every added todo made it into the store
+- every delete and completed toggle the app accepted made it into the store
+- no todo appears twice
+
+Edits and deletes the app rejected with a merge conflict warning are counted
+separately and not expected in the store.
+
+AppTest has no API for data_editor edits, so _run_with_editor_edits() sends
+them through AppTest internals; it refuses to run on untested Streamlit versions.
+
+Usage:
+    python -m buggy_tasks.loadtest [--sessions 50] [--operations 20] [--initial-todos 200]
+"""
+
+# Standard library imports
+import argparse
+import json
+import re
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Local application imports
+import buggy_tasks.derive_tags as derive_tags_module
+import buggy_tasks.io as io_module
+import buggy_tasks.priority as priority_module
+import buggy_tasks.store as store_module
+from buggy_tasks.commands import registry
+
+# Constants and configuration
+APP_PATH = Path(__file__).parent / "app.py"
+TRAIN_DATA_PATH = Path(__file__).parent.parent / "data" / "train-data.json"
+
+# Relative frequency of each operation in the generated workloads
+DEFAULT_MIX = {"add": 0.45, "translate": 0.05, "edit": 0.3, "delete": 0.15, "clear": 0.001}
+
+# AppTest swaps the global Streamlit runtime per rerun, so only one rerun runs at a time
+_RERUN_LOCK = threading.Lock()
+
+# Streamlit versions whose AppTest internals _run_with_editor_edits() supports: [minimum, maximum)
+EDITOR_EDITS_STREAMLIT_VERSIONS = ((1, 32), (2, 0))
+
+# Tags handed out by the stubbed tag backend
+STUB_TAGS = ["work", "chores", "family", "health", "learning", "cleaning", "python"]
+
+
+@dataclass
+class SessionResult:
+    """Measurements and intentions recorded by a single session"""
+    rerun_latencies: List[float] = field(default_factory=list)
+    response_latencies: List[float] = field(default_factory=list)
+    added: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+    # (task, completed) values set by accepted edits
+    completed_edits: List[Tuple[str, bool]] = field(default_factory=list)
+    cleared: int = 0
+    rejected_writes: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class _StoreJournal:
+    """Records every todo list the store publishes, in version order"""
+
+    def __init__(self):
+        """Initialize an empty journal."""
+        self.versions: List[List[str]] = []
+        # Every (task, completed) pair that was published at some point
+        self.completion_states: Set[Tuple[str, bool]] = set()
+        self._lock = threading.Lock()
+        self._save_todos = store_module.save_todos
+
+    def save_todos(self, todos: List[Dict[str, Any]]) -> None:
+        """Record the published list, then save it like the store normally does."""
+        with self._lock:
+            self.versions.append([todo["task"] for todo in todos])
+            self.completion_states.update((todo["task"], bool(todo["completed"])) for todo in todos)
+        self._save_todos(todos)
+
+
+def _stub_derive_tags(text: str) -> List[str]:
+    """Stubbed tag backend: deterministic tags derived from the text."""
+    first_tag = STUB_TAGS[sum(map(ord, text)) % len(STUB_TAGS)]
+    second_tag = STUB_TAGS[len(text) % len(STUB_TAGS)]
+    return sorted({first_tag, second_tag})
+
+
+def _stub_translate(text: str, target_lang: str) -> str:
+    """Stubbed translate backend: marks the text with the target language."""
+    return f"{text} [{target_lang.upper()}]"
+
+
+def _stub_compute_priority(tags: List[str]) -> int:
+    """Stubbed priority backend, used when no trained model is available."""
+    return 1 + len(tags) % 3
+
+
+def install_stubs(data_dir: Path, use_real_priority: bool) -> Tuple[_StoreJournal, "store_module.TodoStore"]:
+    """
+    Replace external backends with stubs and point storage at a scratch directory.
+
+    The app sessions share a todo store built here from the todos in data_dir.
+
+    Args:
+        data_dir: Directory for todos.json
+        use_real_priority: Whether to keep the trained priority model
+
+    Returns:
+        Tuple of (the journal recording every published version of the store,
+        the store shared by the app sessions)
+    """
+    io_module.DATA_DIR = data_dir
+    io_module.TODOS_PATH = data_dir / io_module.TODOS_FILENAME
+
+    # The app re-imports these names on every rerun, so patching the modules suffices
+    derive_tags_module.derive_tags_from_text = _stub_derive_tags
+    if not use_real_priority:
+        priority_module.compute_priority = _stub_compute_priority
+
+    command_info = registry.commands["translate"]
+    registry.register(command_info.name, command_info.description, command_info.example)(_stub_translate)
+
+    journal = _StoreJournal()
+    store_module.save_todos = journal.save_todos
+
+    store = store_module.TodoStore()
+    store_module.set_shared_store(store)
+    return journal, store
+
+
+def write_initial_todos(data_dir: Path, count: int) -> List[str]:
+    """
+    Fill todos.json with a realistic list built from the training data.
+
+    Args:
+        data_dir: Directory for todos.json
+        count: Number of todos to write
+
+    Returns:
+        The task names written
+    """
+    with open(TRAIN_DATA_PATH, "r") as file_handle:
+        examples = json.load(file_handle)
+
+    todos = []
+    for index in range(count):
+        example = examples[index % len(examples)]
+        todos.append({
+            "task": f"{example['task']} #{index}",
+            "completed": index % 4 == 0,
+            "tags": example["tags"],
+            "priority": example["priority"],
+        })
+
+    with open(data_dir / io_module.TODOS_FILENAME, "w") as file_handle:
+        json.dump(todos, file_handle, indent=2)
+    return [todo["task"] for todo in todos]
+
+
+def generate_workload(rng: random.Random, operations: int, mix: Dict[str, float]) -> List[str]:
+    """
+    Generate a random sequence of operations for one session.
+
+    Args:
+        rng: Seeded random number generator
+        operations: Number of operations
+        mix: Relative frequency of each operation
+
+    Returns:
+        List of operation names
+    """
+    names = list(mix)
+    return rng.choices(names, weights=[mix[name] for name in names], k=operations)
+
+
+def check_editor_edits_supported() -> None:
+    """
+    Check that the installed Streamlit is one _run_with_editor_edits() was written for.
+
+    Raises:
+        RuntimeError: If the Streamlit version is outside EDITOR_EDITS_STREAMLIT_VERSIONS
+    """
+    import streamlit
+
+    installed = tuple(int(part) for part in re.findall(r"\d+", streamlit.__version__)[:2])
+    minimum, maximum = EDITOR_EDITS_STREAMLIT_VERSIONS
+    if not minimum <= installed < maximum:
+        raise RuntimeError(
+            f"The load test sends data_editor edits through AppTest internals, which are only known to "
+            f"work with Streamlit >= {'.'.join(map(str, minimum))}, < {'.'.join(map(str, maximum))}; "
+            f"found {streamlit.__version__}")
+
+
+def _run_with_editor_edits(app_test: Any, edited_rows: Dict[int, Dict[str, Any]]) -> None:
+    """
+    Rerun the app with cell edits in its todo table, the way the browser reports them.
+
+    AppTest has no data_editor API, so this is the only place that relies on
+    AppTest internals (_tree and _run); check_editor_edits_supported() guards it.
+
+    Args:
+        app_test: The session, whose last run showed the todo table
+        edited_rows: Changed cells of each edited row, by column name
+    """
+    check_editor_edits_supported()
+
+    widget_states = app_test._tree.get_widget_states()
+    editor_state = widget_states.widgets.add()
+    editor_state.id = app_test.dataframe[0].proto.id
+    editor_state.string_value = json.dumps(
+        {"edited_rows": edited_rows, "added_rows": [], "deleted_rows": []})
+    app_test._run(widget_states)
+
+
+def _timed_run(app_test: Any, result: SessionResult, rerun: Optional[Callable[[], Any]] = None) -> bool:
+    """
+    Rerun the app, recording the latency, rejected writes and any exceptions.
+
+    Args:
+        app_test: The session to rerun
+        result: The session's measurements
+        rerun: Function performing the rerun (defaults to app_test.run)
+
+    Returns:
+        True if the rerun neither failed nor showed a merge conflict warning
+    """
+    errors_before = len(result.errors)
+    requested_at = time.perf_counter()
+    with _RERUN_LOCK:
+        started_at = time.perf_counter()
+        try:
+            (rerun or app_test.run)()
+        except RuntimeError as e:
+            # AppTest raises if a rerun (including st.rerun() loops) exceeds its timeout
+            result.errors.append(str(e))
+        finished_at = time.perf_counter()
+
+    result.rerun_latencies.append(finished_at - started_at)
+    result.response_latencies.append(finished_at - requested_at)
+
+    # The app only warns about edits that conflicted with another session
+    warnings = len(app_test.warning)
+    result.rejected_writes += warnings
+    result.errors.extend(str(exception.value) for exception in app_test.exception)
+    return not warnings and len(result.errors) == errors_before
+
+
+def _edit_rows(app_test: Any, result: SessionResult, edited_rows: Dict[int, Dict[str, Any]]) -> bool:
+    """
+    Apply cell edits to the todo table and rerun.
+
+    Returns:
+        True if the app accepted the edits
+    """
+    if not app_test.dataframe:
+        # The table is gone (e.g. the list was cleared meanwhile): just rerun
+        _timed_run(app_test, result)
+        return False
+
+    return _timed_run(app_test, result, lambda: _run_with_editor_edits(app_test, edited_rows))
+
+
+def run_session(session_index: int, workload: List[str], rng: random.Random, timeout: float) -> SessionResult:
+    """
+    Run one headless app session through its workload.
+
+    Args:
+        session_index: Number of the session, used to make task names unique
+        workload: Operations to perform
+        rng: Seeded random number generator
+        timeout: Maximum time in seconds per rerun
+
+    Returns:
+        The session's measurements
+    """
+    # Deferred import: streamlit's test harness is only needed when actually running
+    from streamlit.testing.v1 import AppTest
+
+    result = SessionResult()
+    app_test = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    _timed_run(app_test, result)
+
+    for operation_index, operation in enumerate(workload):
+        todos = app_test.session_state.todos
+        task_name = f"Load test task s{session_index}-{operation_index}"
+
+        if operation in ("add", "translate"):
+            text = task_name if operation == "add" else f'/translate("{task_name}", "IT")'
+            app_test.text_input(key="new_todo").input(text)
+            next(button for button in app_test.button if button.label.startswith("Add")).click()
+            _timed_run(app_test, result)
+            result.added.add(task_name if operation == "add" else _stub_translate(task_name, "IT"))
+
+        elif operation == "edit" and todos:
+            row = rng.randrange(len(todos))
+            completed = not todos[row]["completed"]
+            if _edit_rows(app_test, result, {row: {"Completed": completed}}):
+                result.completed_edits.append((todos[row]["task"], completed))
+
+        elif operation == "delete" and todos:
+            row = rng.randrange(len(todos))
+            if _edit_rows(app_test, result, {row: {"Delete": True}}):
+                result.deleted.add(todos[row]["task"])
+
+        elif operation == "clear" and todos:
+            next(button for button in app_test.button if button.label == "Clear All Tasks").click()
+            _timed_run(app_test, result)
+            result.cleared += 1
+
+        else:
+            # Nothing to edit, delete or clear: just rerun like an idle user
+            _timed_run(app_test, result)
+
+    return result
+
+
+def check_consistency(store: "store_module.TodoStore", journal: _StoreJournal, initial_tasks: List[str],
+                      results: Sequence[SessionResult]) -> List[str]:
+    """
+    Check the final store and its history for lost or corrupted data.
+
+    Args:
+        store: The store the sessions shared
+        journal: Every version the store published
+        initial_tasks: Task names written before the test
+        results: Results of all sessions
+
+    Returns:
+        List of problems found (empty if consistent)
+    """
+    problems = []
+
+    # The file on disk must match what sessions see
+    saved_tasks = [todo["task"] for todo in io_module.load_todos()]
+    shared_tasks = [todo["task"] for todo in store.snapshot.todos]
+    if saved_tasks != shared_tasks:
+        problems.append(f"todos.json ({len(saved_tasks)} todos) differs from the shared snapshot "
+                        f"({len(shared_tasks)} todos)")
+
+    duplicates = {task for task in shared_tasks if shared_tasks.count(task) > 1}
+    if duplicates:
+        problems.append(f"{len(duplicates)} todos appear more than once, e.g. {sorted(duplicates)[:3]}")
+
+    # Every accepted delete must have removed its todo for good
+    intended_deletions = set().union(*(result.deleted for result in results))
+    not_deleted = intended_deletions & set(shared_tasks)
+    if not_deleted:
+        problems.append(f"{len(not_deleted)} deleted todos are still in the store, e.g. {sorted(not_deleted)[:3]}")
+
+    # Every accepted completed toggle must have been published
+    lost_edits = {edit for result in results for edit in result.completed_edits} - journal.completion_states
+    if lost_edits:
+        problems.append(f"{len(lost_edits)} completed toggles never reached the store, "
+                        f"e.g. {sorted(lost_edits)[:3]}")
+
+    # Every removal between two versions must be explained by a delete or a clear
+    any_clears = any(result.cleared for result in results)
+    unexplained: Set[str] = set()
+    for previous, current in zip([initial_tasks, *journal.versions], journal.versions):
+        if not current and any_clears:
+            continue
+        unexplained |= set(previous) - set(current) - intended_deletions
+    if unexplained:
+        problems.append(f"{len(unexplained)} todos were removed without being deleted, "
+                        f"e.g. {sorted(unexplained)[:3]}")
+
+    # Every add must have been published at least once
+    published = set().union(*map(set, journal.versions)) if journal.versions else set()
+    lost_adds = set().union(*(result.added for result in results)) - published
+    if lost_adds:
+        problems.append(f"{len(lost_adds)} added todos never reached the store, e.g. {sorted(lost_adds)[:3]}")
+
+    errors = [error for result in results for error in result.errors]
+    if errors:
+        problems.append(f"{len(errors)} reruns raised exceptions, e.g. {errors[0]}")
+
+    return problems
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Get a percentile of sorted values using the nearest-rank method."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percentile / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _format_percentiles(sorted_latencies: List[float]) -> str:
+    """Format latency percentiles in milliseconds."""
+    percentiles = ", ".join(
+        f"p{percentile} {_percentile(sorted_latencies, percentile):.0f}" for percentile in (50, 90, 99))
+    return f"{percentiles}, max {sorted_latencies[-1] if sorted_latencies else 0:.0f} ms"
+
+
+def format_report(results: Sequence[SessionResult], elapsed: float, peak_rss_mb: float,
+                  store_size: int, problems: List[str]) -> str:
+    """
+    Format the load test results.
+
+    Args:
+        results: Results of all sessions
+        elapsed: Wall-clock duration of the test in seconds
+        peak_rss_mb: Peak resident memory of the process in MB
+        store_size: Number of todos in the final store
+        problems: Consistency problems found
+
+    Returns:
+        The report as a printable string
+    """
+    rerun_latencies = sorted(latency * 1000 for result in results for latency in result.rerun_latencies)
+    response_latencies = sorted(latency * 1000 for result in results for latency in result.response_latencies)
+
+    lines = [
+        f"Sessions:           {len(results)}",
+        f"Reruns:             {len(rerun_latencies)} in {elapsed:.1f} s "
+        f"({len(rerun_latencies) / elapsed:.1f} reruns/s)",
+        f"Rerun latency:      {_format_percentiles(rerun_latencies)}",
+        f"Response latency:   {_format_percentiles(response_latencies)}",
+        f"Peak memory:        {peak_rss_mb:.0f} MB RSS",
+        f"Adds / deletes:     {sum(len(r.added) for r in results)} / {sum(len(r.deleted) for r in results)}",
+        f"Completed toggles:  {sum(len(r.completed_edits) for r in results)}",
+        f"Clears:             {sum(r.cleared for r in results)}",
+        f"Rejected writes:    {sum(r.rejected_writes for r in results)} (edits conflicting with another session)",
+        f"Final store size:   {store_size} todos",
+    ]
+
+    if problems:
+        lines.append("Consistency: FAIL")
+        lines.extend(f"  - {problem}" for problem in problems)
+    else:
+        lines.append("Consistency: OK")
+    return "\n".join(lines)
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    """Parse an operation mix like "add=0.5,edit=0.3,delete=0.2"."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the load test and print the report.
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code: 0 if the final store is consistent, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Load test the buggy_tasks app with concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=50, help="Number of concurrent sessions")
+    parser.add_argument("--operations", type=int, default=20, help="Operations per session")
+    parser.add_argument("--initial-todos", type=int, default=200, help="Size of the pre-filled todo list")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. add=0.5,edit=0.3,delete=0.2,clear=0")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the workloads")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Maximum time in seconds per rerun")
+    args = parser.parse_args(argv)
+
+    try:
+        check_editor_edits_supported()
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    data_dir = Path(tempfile.mkdtemp(prefix="buggy-tasks-loadtest-"))
+    use_real_priority = priority_module.MODEL_PATH.exists()
+    if not use_real_priority:
+        print(f"No priority model at {priority_module.MODEL_PATH}, using a stub")
+
+    initial_tasks = write_initial_todos(data_dir, args.initial_todos)
+    journal, store = install_stubs(data_dir, use_real_priority)
+
+    workloads = [
+        (index, generate_workload(random.Random(args.seed + index), args.operations, args.mix),
+         random.Random(args.seed + index))
+        for index in range(args.sessions)
+    ]
+
+    print(f"Running {args.sessions} sessions x {args.operations} operations "
+          f"on {args.initial_todos} todos (data in {data_dir})")
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        results = list(executor.map(
+            lambda workload: run_session(*workload, timeout=args.timeout), workloads))
+    elapsed = time.perf_counter() - started_at
+
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+    problems = check_consistency(store, journal, initial_tasks, results)
+    print(format_report(results, elapsed, peak_rss_mb, len(store.snapshot.todos), problems))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,21 +6,22 @@ Priority Calculation Module
 
 This module uses machine learning to predict the priority of tasks based on their tags.
 It uses a Support Vector Classifier with TF-IDF feature extraction.
+
+scikit-learn, joblib and numpy are imported inside the functions that need
+them, so importing this module at app startup stays cheap.
+
+Each trained model is identified by a hash of its file (see get_model_version),
+which is stored with every todo so stale priorities can be found after retraining.
 """
 
 # Standard library imports
+import hashlib
 import json
 import os
 import logging
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Union
-
-# Third-party imports
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import SVC
-from sklearn.pipeline import Pipeline, make_pipeline
-import joblib
-import numpy as np
+from typing import List, Dict, Any, Optional, Union
 
 # Constants and configuration
 BASE_DIR = Path(__file__).parent
@@ -30,6 +31,16 @@ DATA_DIR = BASE_DIR.parent / "data"
 REFERENCE_DATA_PATH = DATA_DIR / "train-data.json"
 MODEL_PATH = BASE_DIR / "priority_model.pkl"
 
+# Address of a shared priority server, e.g. "unix:/tmp/buggy-tasks-priority.sock"
+PRIORITY_SERVER_ENV_VAR = "BUGGY_TASKS_PRIORITY_SERVER"
+
+# Priority given to a task while the model cannot score it
+DEFAULT_PRIORITY = 2
+
+# Loaded model and model version, with the modification times of the file they came from
+_model_cache: Dict[str, Any] = {}
+_model_lock = threading.Lock()
+
 
 def train_priority_model(train_data_path: str = REFERENCE_DATA_PATH) -> None:
     """
@@ -38,6 +49,12 @@ def train_priority_model(train_data_path: str = REFERENCE_DATA_PATH) -> None:
     This function loads reference data containing tags and priorities,
     trains a machine learning model (TF-IDF + SVC), and saves it to disk.
     """
+    # Deferred imports: training is the only place that needs sklearn directly
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.svm import SVC
+    from sklearn.pipeline import make_pipeline
+    import joblib
+
     print("Starting model training process...")
 
     try:
@@ -68,8 +85,11 @@ def train_priority_model(train_data_path: str = REFERENCE_DATA_PATH) -> None:
         ml_pipeline.fit(feature_texts, target_priorities)
 
         # Save the trained model to disk for later use
+        # Write to a temporary file first, so running apps never load a half-written model
         print(f"Saving trained model to {MODEL_PATH}")
-        joblib.dump(ml_pipeline, MODEL_PATH)
+        temporary_path = MODEL_PATH.with_suffix(".pkl.tmp")
+        joblib.dump(ml_pipeline, temporary_path)
+        os.replace(temporary_path, MODEL_PATH)
         print("Model training completed successfully")
 
     except Exception as e:
@@ -77,45 +97,127 @@ def train_priority_model(train_data_path: str = REFERENCE_DATA_PATH) -> None:
         raise
 
 
-def compute_priority(tags: List[str]) -> int:
+def load_priority_model() -> Any:
     """
-    Predict the priority of a task based on its tags.
+    Load the trained priority model, reusing the loaded copy until the model file changes.
+
+    Returns:
+        The trained scikit-learn pipeline
+
+    Raises:
+        FileNotFoundError: If the trained model file doesn't exist
+    """
+    # Deferred import: unpickling the model pulls in sklearn anyway
+    import joblib
+
+    model_mtime = MODEL_PATH.stat().st_mtime_ns
+
+    with _model_lock:
+        # Reload only if the model was retrained since we last loaded it
+        if _model_cache.get("mtime") != model_mtime:
+            print(f"Loading model from {MODEL_PATH}")
+            _model_cache["model"] = joblib.load(MODEL_PATH)
+            _model_cache["mtime"] = model_mtime
+        return _model_cache["model"]
+
+
+def get_model_version() -> Optional[str]:
+    """
+    Identify the current priority model by a hash of its file.
+
+    Returns:
+        Short hex digest of the model file, or None if no model has been trained
+    """
+    try:
+        model_mtime = MODEL_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _model_lock:
+        # Hash the file only if it changed since we last looked
+        if _model_cache.get("version_mtime") != model_mtime:
+            _model_cache["version"] = hashlib.sha256(MODEL_PATH.read_bytes()).hexdigest()[:12]
+            _model_cache["version_mtime"] = model_mtime
+        return _model_cache["version"]
+
+
+def predict_priorities(feature_texts: List[str]) -> List[int]:
+    """
+    Predict priorities for several tag strings with a single vectorized call.
 
     Args:
-        tags: A list of tags associated with the task
+        feature_texts: Space-separated tags of each task
 
     Returns:
-        Integer priority score (higher means more important)
+        List of integer priority scores, in the same order
+    """
+    predicted_priorities = load_priority_model().predict(feature_texts)
+
+    # Convert to Python ints (from numpy types)
+    return [int(priority) for priority in predicted_priorities]
+
+
+def compute_priorities(tag_lists: List[List[str]]) -> List[int]:
+    """
+    Predict the priorities of several tasks at once.
+
+    If the BUGGY_TASKS_PRIORITY_SERVER environment variable points to a running
+    priority server (see buggy_tasks.priority_server), the prediction is made
+    there, so multiple app processes share one copy of the model. Otherwise, or
+    if the server cannot be reached, the model is loaded in this process.
+
+    Args:
+        tag_lists: The tags of each task
+
+    Returns:
+        List of integer priority scores, in the same order
 
     Raises:
         FileNotFoundError: If the trained model file doesn't exist
     """
+    # Convert tags lists to the format expected by the model
+    feature_texts = [" ".join(tags) for tags in tag_lists]
+
+    server_address = os.environ.get(PRIORITY_SERVER_ENV_VAR)
+    if server_address:
+        # Deferred import: the client is only needed when a server is configured
+        from buggy_tasks.priority_server import request_priorities
+
+        try:
+            return request_priorities(server_address, feature_texts)
+        except (OSError, ValueError) as e:
+            print(f"Priority server unavailable, computing priority in-process: {e}")
+
     # Verify the model file exists
     if not MODEL_PATH.exists():
         error_msg = f"Priority model not found at {MODEL_PATH}. Run train_priority_model() first."
         print(error_msg)
         raise FileNotFoundError(error_msg)
 
-    try:
-        # Load the trained machine learning model
-        print(f"Loading model from {MODEL_PATH}")
-        priority_model = joblib.load(MODEL_PATH)
+    return predict_priorities(feature_texts)
 
-        # Convert tags list to the format expected by the model
-        tags_feature = " ".join(tags)
-        print(f"Computing priority for tags: {tags_feature}")
 
-        # Make prediction using the model
-        predicted_priority = priority_model.predict([tags_feature])[0]
+def compute_priority(tags: List[str]) -> int:
+    """
+    Predict the priority of a task based on its tags.
 
-        # Convert to Python int if needed (from numpy type)
-        if isinstance(predicted_priority, np.integer):
-            predicted_priority = int(predicted_priority)
+    See compute_priorities for how the prediction is made.
 
-        print(f"Computed priority {predicted_priority} for tags: {tags}")
-        return predicted_priority
+    Args:
+        tags: A list of tags associated with the task
 
-    except Exception as e:
-        print(f"Error computing priority: {e}")
-        # Return a default priority in case of error
-        return 2
+    Returns:
+        Integer priority score (higher means more important)
+
+    Raises:
+        FileNotFoundError: If the trained model file doesn't exist
+        Exception: Any error raised by the model; callers fall back to
+            DEFAULT_PRIORITY and leave the todo for re-scoring
+    """
+    print(f"Computing priority for tags: {' '.join(tags)}")
+
+    # Make prediction using the model
+    predicted_priority = compute_priorities([tags])[0]
+
+    print(f"Computed priority {predicted_priority} for tags: {tags}")
+    return predicted_priority
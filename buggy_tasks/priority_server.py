@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Priority Inference Server
+
+This module provides a small local server that holds the priority model once and
+serves predictions to several app processes. Concurrent requests are batched
+into a single vectorized predict call.
+
+The protocol is newline-delimited JSON over a Unix socket or localhost TCP:
+    request:  {"texts": ["work python", "family chores"]}
+    response: {"priorities": [3, 1]}  or  {"error": "..."}
+
+Usage:
+    python -m buggy_tasks.priority_server --address unix:/tmp/buggy-tasks-priority.sock
+    BUGGY_TASKS_PRIORITY_SERVER=unix:/tmp/buggy-tasks-priority.sock poe start
+"""
+
+# Standard library imports
+import argparse
+import errno
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+# Local application imports
+from buggy_tasks.priority import PRIORITY_SERVER_ENV_VAR, load_priority_model, predict_priorities
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Configuration
+DEFAULT_ADDRESS = "unix:/tmp/buggy-tasks-priority.sock"
+CLIENT_TIMEOUT = 1.0
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 5.0
+# Pending connections the server accepts before refusing new ones
+SERVER_BACKLOG = 128
+
+
+def parse_address(address: str) -> Tuple[int, Union[str, Tuple[str, int]]]:
+    """
+    Parse a server address into a socket family and socket address.
+
+    Args:
+        address: "unix:<path>" for a Unix socket or "<host>:<port>" for TCP
+
+    Returns:
+        Tuple of (socket family, socket address)
+
+    Raises:
+        ValueError: If the address cannot be parsed
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Invalid priority server address: {address}")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def request_priorities(address: str, feature_texts: List[str], timeout: float = CLIENT_TIMEOUT) -> List[int]:
+    """
+    Request priority predictions from a running priority server.
+
+    Args:
+        address: Server address (see parse_address)
+        feature_texts: Space-separated tags of each task
+        timeout: Maximum time in seconds to wait for the server
+
+    Returns:
+        List of integer priority scores, in the same order
+
+    Raises:
+        OSError: If the server cannot be reached
+        ValueError: If the server returns an error or an invalid response
+    """
+    family, socket_address = parse_address(address)
+
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_address)
+        connection.sendall(json.dumps({"texts": feature_texts}).encode() + b"\n")
+        with connection.makefile("rb") as reader:
+            response_line = reader.readline()
+
+    if not response_line:
+        raise ValueError("Priority server closed the connection without a response")
+
+    # json.JSONDecodeError is a ValueError, like the other malformed response errors
+    response = json.loads(response_line)
+    if not isinstance(response, dict):
+        raise ValueError(f"Invalid priority server response: {response!r}")
+    if "error" in response:
+        raise ValueError(f"Priority server error: {response['error']}")
+
+    priorities = response.get("priorities")
+    if (not isinstance(priorities, list) or len(priorities) != len(feature_texts)
+            or not all(isinstance(priority, int) for priority in priorities)):
+        raise ValueError(f"Invalid priority server response: {response!r}")
+    return priorities
+
+
+class PredictionBatcher:
+    """
+    Collects concurrent prediction requests and runs them as one batch.
+
+    A batch is sent to the model as soon as it holds `max_batch_size` texts or
+    `max_wait` seconds after its first request arrived, whichever comes first.
+    """
+
+    def __init__(self, predict: Callable[[List[str]], List[int]] = predict_priorities,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait: float = DEFAULT_MAX_WAIT_MS / 1000):
+        """Initialize the batcher without starting its worker thread."""
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._predict = predict
+        self._queue: "queue.Queue[Optional[Tuple[List[str], Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="buggy-tasks-batcher", daemon=True)
+
+    def start(self) -> None:
+        """Start the worker thread that runs the batches."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread after the pending requests are done."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, feature_texts: List[str]) -> Future:
+        """
+        Queue texts for prediction.
+
+        Args:
+            feature_texts: Space-separated tags of each task
+
+        Returns:
+            Future resolving to the list of predicted priorities
+        """
+        future: Future = Future()
+        self._queue.put((feature_texts, future))
+        return future
+
+    def _run(self) -> None:
+        """Take requests from the queue and predict them in batches until stopped."""
+        while True:
+            first_request = self._queue.get()
+            if first_request is None:
+                return
+
+            # Gather more requests until the batch is full or the wait is over
+            batch = [first_request]
+            batch_size = len(first_request[0])
+            deadline = time.monotonic() + self.max_wait
+            while batch_size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    # Stop after this batch
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+                batch_size += len(request[0])
+
+            self._predict_batch(batch)
+
+    def _predict_batch(self, batch: List[Tuple[List[str], Future]]) -> None:
+        """Run one vectorized prediction and hand each request its share of the results."""
+        all_texts = [text for feature_texts, _ in batch for text in feature_texts]
+        logger.debug(f"Predicting batch of {len(all_texts)} texts from {len(batch)} requests")
+
+        try:
+            predictions = self._predict(all_texts) if all_texts else []
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for feature_texts, future in batch:
+            future.set_result(predictions[offset:offset + len(feature_texts)])
+            offset += len(feature_texts)
+
+
+class _PriorityRequestHandler(socketserver.StreamRequestHandler):
+    """Handles newline-delimited JSON prediction requests on one connection"""
+
+    def handle(self) -> None:
+        """Answer requests until the client closes the connection."""
+        for request_line in self.rfile:
+            try:
+                feature_texts = json.loads(request_line)["texts"]
+                if not isinstance(feature_texts, list) or not all(isinstance(text, str) for text in feature_texts):
+                    raise ValueError("'texts' must be a list of strings")
+                response: Any = {"priorities": self.server.batcher.submit(feature_texts).result()}
+            except Exception as e:
+                logger.error(f"Error serving priority request: {e}")
+                response = {"error": str(e)}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class _ThreadingUnixStreamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server handling each connection on its own thread"""
+    daemon_threads = True
+    request_queue_size = SERVER_BACKLOG
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    """TCP server handling each connection on its own thread"""
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = SERVER_BACKLOG
+
+
+def _is_listening(socket_path: str) -> bool:
+    """Check whether a server is accepting connections on a Unix socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(CLIENT_TIMEOUT)
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def create_server(address: str, batcher: PredictionBatcher) -> socketserver.BaseServer:
+    """
+    Create a priority server listening on the given address.
+
+    Args:
+        address: Address to listen on (see parse_address)
+        batcher: Batcher used to run the predictions
+
+    Returns:
+        The bound server, ready for serve_forever()
+
+    Raises:
+        OSError: If another server is already listening on the address
+    """
+    family, socket_address = parse_address(address)
+
+    if family == socket.AF_UNIX:
+        if os.path.exists(socket_address):
+            if _is_listening(socket_address):
+                raise OSError(errno.EADDRINUSE, f"A priority server is already listening on {address}")
+            # Remove a stale socket file left behind by a previous server
+            os.unlink(socket_address)
+        server: socketserver.BaseServer = _ThreadingUnixStreamServer(socket_address, _PriorityRequestHandler)
+    else:
+        server = _ThreadingTCPServer(socket_address, _PriorityRequestHandler)
+
+    server.batcher = batcher
+    return server
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the priority server until interrupted.
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Serve priority predictions to buggy_tasks app processes")
+    parser.add_argument("--address", default=os.environ.get(PRIORITY_SERVER_ENV_VAR, DEFAULT_ADDRESS),
+                        help="unix:<path> or <host>:<port> to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Maximum number of texts per prediction batch")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Maximum time to wait for more requests before predicting")
+    args = parser.parse_args(argv)
+
+    # Load the model up front, so the first request does not pay for it
+    load_priority_model()
+
+    batcher = PredictionBatcher(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    try:
+        server = create_server(args.address, batcher)
+    except OSError as e:
+        print(f"Cannot start priority server: {e}")
+        return 1
+    batcher.start()
+
+    print(f"Priority server listening on {args.address}")
+    print(f"Start the app with {PRIORITY_SERVER_ENV_VAR}={args.address} to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down priority server")
+    finally:
+        server.server_close()
+        batcher.stop()
+        family, socket_address = parse_address(args.address)
+        if family == socket.AF_UNIX and os.path.exists(socket_address):
+            os.unlink(socket_address)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Background Priority Re-Scoring
+
+Every todo records the version of the priority model that scored it in its
+"priority_model" field. After the model is retrained, todos with another (or
+no) version are stale. This module re-scores them on a background thread, in
+batches, publishing each batch to the shared todo store as it goes.
+
+Rows at the top of the table are re-scored first, in a small batch of their
+own, so what the user sees is updated quickly.
+"""
+
+# Standard library imports
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Local application imports
+from buggy_tasks.priority import compute_priorities, get_model_version
+from buggy_tasks.store import TodoStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of todos scored per prediction batch
+DEFAULT_BATCH_SIZE = 32
+
+
+@dataclass(frozen=True)
+class RescoreProgress:
+    """Progress of re-scoring stale todos for a model version"""
+    model_version: Optional[str]
+    total: int
+    done: int
+    running: bool
+
+    @property
+    def fraction(self) -> float:
+        """Share of stale todos re-scored so far, between 0 and 1"""
+        return min(1.0, self.done / self.total) if self.total else 1.0
+
+
+def find_stale_todos(todos: Sequence[Mapping[str, Any]], model_version: str) -> List[int]:
+    """
+    Find todos whose priority was computed by a different model version.
+
+    Args:
+        todos: The todo list
+        model_version: Version of the current priority model
+
+    Returns:
+        Indices of the stale todos, top of the list first
+    """
+    return [index for index, todo in enumerate(todos) if todo.get("priority_model") != model_version]
+
+
+class PriorityRescorer:
+    """
+    Re-scores stale todos of a todo store on a background thread.
+
+    Call ensure_current() on every rerun: it is cheap when nothing changed and
+    starts a re-scoring run when the store holds todos scored by another model.
+    """
+
+    def __init__(self, store: TodoStore, batch_size: int = DEFAULT_BATCH_SIZE,
+                 score: Callable[[List[List[str]]], List[int]] = compute_priorities):
+        """
+        Initialize the rescorer without starting it.
+
+        Args:
+            store: The todo store to keep up to date
+            batch_size: Number of todos scored per prediction batch
+            score: Function predicting the priorities of several tag lists
+        """
+        self.batch_size = batch_size
+        self._store = store
+        self._score = score
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._progress = RescoreProgress(model_version=None, total=0, done=0, running=False)
+        # (store version, model version) last checked for stale todos
+        self._checked: Tuple[int, Optional[str]] = (-1, None)
+
+    @property
+    def progress(self) -> RescoreProgress:
+        """Progress of the current or last re-scoring run"""
+        return self._progress
+
+    def ensure_current(self, visible_rows: int = 10) -> RescoreProgress:
+        """
+        Start re-scoring in the background if the store holds stale todos.
+
+        Args:
+            visible_rows: Number of rows at the top of the table to re-score first
+
+        Returns:
+            Progress of the current or last re-scoring run
+        """
+        model_version = get_model_version()
+        snapshot = self._store.snapshot
+
+        with self._lock:
+            if self._progress.running or model_version is None:
+                return self._progress
+
+            # Only scan the list again if it or the model changed since the last check
+            if self._checked == (snapshot.version, model_version):
+                return self._progress
+            self._checked = (snapshot.version, model_version)
+
+            stale = find_stale_todos(snapshot.todos, model_version)
+            if not stale:
+                return self._progress
+
+            logger.info(f"Re-scoring {len(stale)} todos for priority model {model_version}")
+            self._progress = RescoreProgress(model_version=model_version, total=len(stale), done=0, running=True)
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(model_version, visible_rows),
+                name="buggy-tasks-rescorer",
+                daemon=True
+            )
+            self._thread.start()
+            return self._progress
+
+    def _run(self, model_version: str, visible_rows: int) -> None:
+        """Re-score stale todos batch by batch until none are left or the model changes again."""
+        done = 0
+        try:
+            while get_model_version() == model_version:
+                todos = self._store.snapshot.todos
+                stale = find_stale_todos(todos, model_version)
+                if not stale:
+                    break
+
+                # Todos edited during the run can become stale too, so recount the total
+                with self._lock:
+                    self._progress = RescoreProgress(
+                        model_version=model_version, total=done + len(stale), done=done, running=True)
+
+                # Visible rows go first, in a batch of their own so they show up quickly
+                batch = [index for index in stale if index < visible_rows] or stale[:self.batch_size]
+                tag_lists = [list(todos[index]["tags"]) for index in batch]
+                priorities = self._score(tag_lists)
+
+                updated = self._apply(model_version, tag_lists, priorities)
+                if not updated:
+                    # The batch was edited away meanwhile; the next check picks up the rest
+                    break
+
+                done += updated
+                with self._lock:
+                    self._progress = RescoreProgress(
+                        model_version=model_version, total=max(done, self._progress.total), done=done, running=True)
+        except Exception as e:
+            logger.error(f"Error re-scoring priorities: {e}")
+        finally:
+            with self._lock:
+                self._progress = RescoreProgress(
+                    model_version=model_version, total=max(done, self._progress.total), done=done, running=False)
+
+    def _apply(self, model_version: str, tag_lists: List[List[str]], priorities: List[int]) -> int:
+        """
+        Write re-scored priorities to the latest version of the store.
+
+        Todos are matched by their tags rather than their position, because
+        other sessions may have added or deleted todos in the meantime.
+
+        Returns:
+            Number of todos updated
+        """
+        scored: Dict[str, int] = {" ".join(tags): priority for tags, priority in zip(tag_lists, priorities)}
+        updated = 0
+
+        def apply_scores(todos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            nonlocal updated
+            for todo in todos:
+                tags_feature = " ".join(todo["tags"])
+                if todo.get("priority_model") != model_version and tags_feature in scored:
+                    todo["priority"] = scored[tags_feature]
+                    todo["priority_model"] = model_version
+                    updated += 1
+            return todos
+
+        self._store.update(apply_scores)
+        return updated
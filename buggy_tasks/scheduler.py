@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Outbound Call Scheduler
+
+This module schedules calls to external AI providers (Mistral, Google Translate).
+It keeps one shared view of each provider's health, so that a slow or failing
+provider makes every caller fall back quickly instead of waiting for each
+request to fail on its own.
+
+For each provider the scheduler applies:
+- Request coalescing: identical in-flight requests share a single call
+- Rate limiting: a token bucket caps the request rate; callers wait for a
+  token up to half the provider's timeout before falling back, leaving the
+  rest for the request itself
+- Circuit breaking: after repeated failures calls fail fast for a while,
+  then a single probe request checks whether the provider has recovered
+- Timeouts: callers never wait longer than the provider's timeout in total,
+  counted from when their call was admitted (token wait included)
+
+Usage:
+    scheduler.configure("mistral", rate_per_second=1.0, timeout=10.0)
+    tags = scheduler.call("mistral", text, request_tags, text, fallback=lambda: ["task"])
+"""
+
+# Standard library imports
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Share of the provider's timeout a call may spend waiting for a rate limit token
+MAX_TOKEN_WAIT_SHARE = 0.5
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class ProviderUnavailableError(RuntimeError):
+    """Raised when a provider call is rejected, times out or fails and no fallback is given"""
+
+
+@dataclass
+class ProviderConfig:
+    """Scheduling limits for a single provider"""
+    # Sustained number of requests per second
+    rate_per_second: float = 5.0
+    # Number of requests that may be sent in a burst
+    burst: int = 10
+    # Maximum time in seconds a caller waits for a result
+    timeout: float = 10.0
+    # Consecutive failures after which the circuit opens
+    failure_threshold: int = 3
+    # Time in seconds the circuit stays open before a probe request
+    reset_timeout: float = 30.0
+
+
+@dataclass(frozen=True)
+class ProviderHealth:
+    """Snapshot of a provider's health metrics"""
+    provider: str
+    state: str
+    calls: int
+    successes: int
+    failures: int
+    timeouts: int
+    rejected: int
+    coalesced: int
+    fallbacks: int
+    consecutive_failures: int
+    average_latency_ms: float
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens are added continuously at `rate` per second, up to `capacity`.
+    Each request takes one token. When the bucket is empty a request can
+    reserve the next token ahead of time and wait until it is due.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic):
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token from the bucket, reserving a future one if none is available.
+
+        Args:
+            max_wait: Maximum time in seconds the caller is willing to wait for a token
+
+        Returns:
+            Time in seconds until the token is due (0 if available now), or None
+            if it would take longer than max_wait (no token is taken then)
+        """
+        now = self._clock()
+        # Refill according to the time passed since the last request
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+        # Reserved tokens leave the bucket in debt, so later callers queue behind them
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker tracking consecutive failures of a provider.
+
+    The circuit opens after `failure_threshold` consecutive failures. While open,
+    all requests are rejected. After `reset_timeout` seconds a single probe
+    request is let through (half-open): success closes the circuit again,
+    failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize a closed circuit."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def cancel_request(self) -> None:
+        """Give back a request allowed by allow_request() that was not sent after all."""
+        if self.state == HALF_OPEN:
+            # Let the next request be the probe instead
+            self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent to the provider.
+
+        Returns:
+            True if the request may proceed, False if it should fail fast
+        """
+        if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            # Time to check whether the provider has recovered
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == CLOSED:
+            return True
+
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            # Only a single probe request at a time
+            self._probe_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful request and close the circuit."""
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed request and open the circuit if needed."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = self._clock()
+
+
+@dataclass
+class _ProviderState:
+    """Mutable per-provider state, guarded by the scheduler lock"""
+    config: ProviderConfig
+    bucket: TokenBucket
+    breaker: CircuitBreaker
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    coalesced: int = 0
+    fallbacks: int = 0
+    total_latency: float = 0.0
+
+
+@dataclass
+class _InFlightCall:
+    """A call that is currently running, shared by all callers with the same key"""
+    future: Future
+    # When the request starts, after waiting for a rate limit token
+    started_at: float
+    # When callers stop waiting: the provider's timeout after the call was admitted
+    deadline: float
+    # Set once the outcome has been recorded (by completion or by timeout)
+    settled: bool = field(default=False)
+
+
+class CallScheduler:
+    """
+    Scheduler for calls to external providers.
+
+    Sync calls run on a shared thread pool and async calls as tasks on the
+    caller's event loop, so a caller can stop waiting when the provider's
+    timeout expires even if the underlying request is still running.
+    """
+
+    def __init__(self, max_workers: int = 8, clock: Callable[[], float] = time.monotonic):
+        """Initialize a scheduler without any configured providers."""
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._providers: Dict[str, _ProviderState] = {}
+        self._in_flight: Dict[Tuple[str, Hashable], _InFlightCall] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="buggy-tasks-scheduler")
+
+    def configure(self, provider: str, **limits: Any) -> None:
+        """
+        Set the scheduling limits for a provider.
+
+        Args:
+            provider: Provider name
+            **limits: Fields of ProviderConfig to override
+        """
+        state = self._new_provider_state(ProviderConfig(**limits))
+        with self._lock:
+            self._providers[provider] = state
+
+    def call(self, provider: str, key: Hashable, func: Callable, *args: Any,
+             fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Call a provider through the scheduler.
+
+        Args:
+            provider: Provider name
+            key: Identity of the request; concurrent calls with the same key are coalesced
+            func: Function performing the request
+            *args: Arguments to pass to func
+            fallback: Function returning a fallback result if the call cannot be served
+
+        Returns:
+            The result of func, or of fallback if the call is rejected, times out or fails
+
+        Raises:
+            ProviderUnavailableError: If the call cannot be served and no fallback is given
+        """
+        call_key, state, in_flight, is_leader, rejection = self._admit(provider, key)
+        if rejection is not None:
+            return self._fail(provider, state, fallback, rejection)
+
+        if is_leader:
+            # Wait for the reserved rate limit token, then start the request
+            time.sleep(max(0.0, in_flight.started_at - self._clock()))
+            self._executor.submit(self._run, call_key, state, in_flight, func, args)
+
+        try:
+            return in_flight.future.result(timeout=self._remaining_time(in_flight))
+        except FutureTimeoutError:
+            self._record_timeout(call_key, state, in_flight)
+            return self._fail(provider, state, fallback, f"timed out after {state.config.timeout}s")
+        except Exception as e:
+            return self._fail(provider, state, fallback, str(e), cause=e)
+
+    async def call_async(self, provider: str, key: Hashable, func: Callable, *args: Any,
+                         fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Call a provider through the scheduler from a coroutine.
+
+        Works like call(), but func is a coroutine function that runs on the
+        caller's event loop. Sync and async calls with the same key are coalesced.
+
+        Args:
+            provider: Provider name
+            key: Identity of the request; concurrent calls with the same key are coalesced
+            func: Coroutine function performing the request
+            *args: Arguments to pass to func
+            fallback: Function returning a fallback result if the call cannot be served
+
+        Returns:
+            The result of func, or of fallback if the call is rejected, times out or fails
+
+        Raises:
+            ProviderUnavailableError: If the call cannot be served and no fallback is given
+        """
+        call_key, state, in_flight, is_leader, rejection = self._admit(provider, key)
+        if rejection is not None:
+            return self._fail(provider, state, fallback, rejection)
+
+        if is_leader:
+            # The task waits for the reserved rate limit token, even if this caller is cancelled
+            task = asyncio.ensure_future(self._run_async(call_key, state, in_flight, func, args))
+            # Keep a reference so the task is not garbage collected while running
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            # Shield the request, so a timeout only stops this caller from waiting
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(in_flight.future)), self._remaining_time(in_flight))
+        except asyncio.TimeoutError:
+            self._record_timeout(call_key, state, in_flight)
+            return self._fail(provider, state, fallback, f"timed out after {state.config.timeout}s")
+        except Exception as e:
+            return self._fail(provider, state, fallback, str(e), cause=e)
+
+    def health(self) -> Dict[str, ProviderHealth]:
+        """
+        Get health metrics for all configured providers.
+
+        Returns:
+            Mapping of provider name to a snapshot of its metrics
+        """
+        with self._lock:
+            return {
+                name: ProviderHealth(
+                    provider=name,
+                    state=state.breaker.state,
+                    calls=state.calls,
+                    successes=state.successes,
+                    failures=state.failures,
+                    timeouts=state.timeouts,
+                    rejected=state.rejected,
+                    coalesced=state.coalesced,
+                    fallbacks=state.fallbacks,
+                    consecutive_failures=state.breaker.consecutive_failures,
+                    average_latency_ms=(
+                        state.total_latency / state.successes * 1000 if state.successes else 0.0
+                    ),
+                )
+                for name, state in self._providers.items()
+            }
+
+    def _new_provider_state(self, config: ProviderConfig) -> _ProviderState:
+        """Create fresh state for a provider with the given limits."""
+        return _ProviderState(
+            config=config,
+            bucket=TokenBucket(config.rate_per_second, config.burst, self._clock),
+            breaker=CircuitBreaker(config.failure_threshold, config.reset_timeout, self._clock),
+        )
+
+    def _get_provider(self, provider: str) -> _ProviderState:
+        """Get the state of a provider, configuring defaults if needed. Caller holds the lock."""
+        if provider not in self._providers:
+            self._providers[provider] = self._new_provider_state(ProviderConfig())
+        return self._providers[provider]
+
+    def _admit(self, provider: str, key: Hashable) -> Tuple[
+            Tuple[str, Hashable], _ProviderState, Optional[_InFlightCall], bool, Optional[str]]:
+        """
+        Join an identical in-flight call or register a new one if the provider allows it.
+
+        A new call is scheduled for when its rate limit token is due; the caller
+        that registered it (the leader) starts the request at that time.
+
+        Args:
+            provider: Provider name
+            key: Identity of the request
+
+        Returns:
+            Tuple of (call key, provider state, in-flight call, whether this caller
+            is the leader, reason the call was rejected or None)
+        """
+        call_key = (provider, key)
+
+        with self._lock:
+            state = self._get_provider(provider)
+            in_flight = self._in_flight.get(call_key)
+
+            if in_flight is not None:
+                # Piggyback on the identical request that is already running
+                state.coalesced += 1
+                return call_key, state, in_flight, False, None
+
+            # Check the circuit first, so an open circuit does not use up tokens
+            if not state.breaker.allow_request():
+                state.rejected += 1
+                return call_key, state, None, False, "circuit is open"
+
+            wait = state.bucket.reserve(max_wait=state.config.timeout * MAX_TOKEN_WAIT_SHARE)
+            if wait is None:
+                state.breaker.cancel_request()
+                state.rejected += 1
+                return call_key, state, None, False, "rate limit exceeded"
+
+            state.calls += 1
+            now = self._clock()
+            in_flight = _InFlightCall(future=Future(), started_at=now + wait, deadline=now + state.config.timeout)
+            self._in_flight[call_key] = in_flight
+            return call_key, state, in_flight, True, None
+
+    def _remaining_time(self, in_flight: _InFlightCall) -> float:
+        """Time left until an in-flight call times out, so late joiners do not wait longer than its leader."""
+        return max(0.0, in_flight.deadline - self._clock())
+
+    def _run(self, call_key: Tuple[str, Hashable], state: _ProviderState, in_flight: _InFlightCall,
+             func: Callable, args: Tuple[Any, ...]) -> None:
+        """Run a provider request on the worker pool and record its outcome."""
+        try:
+            result = func(*args)
+        except Exception as e:
+            self._settle(call_key, state, in_flight, error=e)
+        else:
+            self._settle(call_key, state, in_flight, result=result)
+
+    async def _run_async(self, call_key: Tuple[str, Hashable], state: _ProviderState,
+                         in_flight: _InFlightCall, func: Callable, args: Tuple[Any, ...]) -> None:
+        """Run an async provider request on the caller's loop and record its outcome."""
+        # Wait for the reserved rate limit token
+        await asyncio.sleep(max(0.0, in_flight.started_at - self._clock()))
+        try:
+            result = await func(*args)
+        except Exception as e:
+            self._settle(call_key, state, in_flight, error=e)
+        else:
+            self._settle(call_key, state, in_flight, result=result)
+
+    def _settle(self, call_key: Tuple[str, Hashable], state: _ProviderState, in_flight: _InFlightCall,
+                result: Any = None, error: Optional[Exception] = None) -> None:
+        """Record the outcome of a finished request and hand it to all waiting callers."""
+        provider = call_key[0]
+
+        with self._lock:
+            # A timed out call may already have been replaced by a new one with the same key
+            if self._in_flight.get(call_key) is in_flight:
+                del self._in_flight[call_key]
+            if not in_flight.settled:
+                in_flight.settled = True
+                if error is not None:
+                    self._record_failure(provider, state)
+                else:
+                    state.successes += 1
+                    state.total_latency += self._clock() - in_flight.started_at
+                    state.breaker.record_success()
+
+        if error is not None:
+            logger.warning(f"Call to {provider} failed: {error}")
+            in_flight.future.set_exception(error)
+        else:
+            in_flight.future.set_result(result)
+
+    def _record_timeout(self, call_key: Tuple[str, Hashable], state: _ProviderState,
+                        in_flight: _InFlightCall) -> None:
+        """Count a timed out call as a failure, once, and stop new callers from joining it."""
+        with self._lock:
+            # Retries start a new request instead of waiting on the hung one
+            if self._in_flight.get(call_key) is in_flight:
+                del self._in_flight[call_key]
+            if not in_flight.settled:
+                # The late result is ignored for health purposes
+                in_flight.settled = True
+                state.timeouts += 1
+                self._record_failure(call_key[0], state)
+
+    def _record_failure(self, provider: str, state: _ProviderState) -> None:
+        """Record a failed request and log circuit transitions. Caller holds the lock."""
+        was_open = state.breaker.state == OPEN
+        state.failures += 1
+        state.breaker.record_failure()
+        if state.breaker.state == OPEN and not was_open:
+            logger.error(
+                f"Circuit for {provider} opened after {state.breaker.consecutive_failures} failures; "
+                f"failing fast for {state.config.reset_timeout}s")
+
+    def _fail(self, provider: str, state: _ProviderState, fallback: Optional[Callable[[], Any]],
+              reason: str, cause: Optional[Exception] = None) -> Any:
+        """Return the fallback result or raise if there is none."""
+        if fallback is None:
+            raise ProviderUnavailableError(f"{provider} unavailable: {reason}") from cause
+
+        with self._lock:
+            state.fallbacks += 1
+        logger.info(f"Using fallback for {provider}: {reason}")
+        return fallback()
+
+
+# Create the singleton scheduler instance for the application
+scheduler = CallScheduler()
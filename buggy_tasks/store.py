@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shared Todo Store
+
+This module keeps one read-only, versioned snapshot of the todo list per process.
+All browser sessions reference the same snapshot instead of holding their own copy.
+
+Writes are copy-on-write: each write builds a new list from a private copy,
+persists it and publishes it as the next version. Other sessions pick up the
+new version on their next rerun.
+
+A session that edited the version it was shown hands its row changes to
+merge(), which re-applies them to the latest version, so edits made while
+other sessions were writing are neither lost nor overwrite newer data.
+"""
+
+# Standard library imports
+import logging
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+# Local application imports
+from buggy_tasks.io import load_todos, save_todos
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fields set by the user; a todo is recognised in a newer version by these
+USER_FIELDS = ("task", "completed", "tags")
+
+
+@dataclass(frozen=True)
+class TodoSnapshot:
+    """An immutable version of the todo list"""
+    version: int
+    todos: Tuple[Mapping[str, Any], ...]
+
+
+def _freeze(todos: List[Dict[str, Any]]) -> Tuple[Mapping[str, Any], ...]:
+    """Make a read-only copy of a todo list, so shared snapshots cannot be modified in place."""
+    return tuple(
+        MappingProxyType({**todo, "tags": tuple(todo.get("tags", ()))})
+        for todo in todos
+    )
+
+
+def thaw_todos(todos: Tuple[Mapping[str, Any], ...]) -> List[Dict[str, Any]]:
+    """Make a private, writable copy of a todo list snapshot."""
+    return [{**todo, "tags": list(todo.get("tags", ()))} for todo in todos]
+
+
+def _find_todo(todos: List[Dict[str, Any]], original: Dict[str, Any], preferred_index: int,
+               taken: Set[int]) -> Optional[int]:
+    """Find the position of a todo whose user fields still match the original, preferring its old position."""
+    def matches(index: int) -> bool:
+        return index not in taken and all(todos[index].get(name) == original.get(name) for name in USER_FIELDS)
+
+    if preferred_index < len(todos) and matches(preferred_index):
+        return preferred_index
+    return next((index for index in range(len(todos)) if matches(index)), None)
+
+
+class TodoStore:
+    """
+    Process-wide store holding the current snapshot of the todo list.
+
+    Readers use `snapshot` and never copy. Writers either apply a change to the
+    latest version with update(), or merge row changes made to a version they
+    read earlier with merge().
+    """
+
+    def __init__(self, todos: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            todos: Initial todo list; loaded from storage if not given
+        """
+        self._lock = threading.Lock()
+        self._snapshot = TodoSnapshot(version=0, todos=_freeze(load_todos() if todos is None else todos))
+
+    @property
+    def snapshot(self) -> TodoSnapshot:
+        """The current version of the todo list"""
+        return self._snapshot
+
+    def update(self, change: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]) -> TodoSnapshot:
+        """
+        Apply a change to the latest version of the todo list and publish the result.
+
+        The change runs while holding the store lock, so concurrent updates from
+        different sessions are applied one after another and none is lost.
+        A change that leaves the list as it was is not published or saved.
+
+        Args:
+            change: Function taking a writable copy of the todos and returning the new list
+
+        Returns:
+            The newly published snapshot, or the current one if nothing changed
+        """
+        with self._lock:
+            todos = change(thaw_todos(self._snapshot.todos))
+            if todos == thaw_todos(self._snapshot.todos):
+                return self._snapshot
+            return self._publish(todos)
+
+    def merge(self, base: TodoSnapshot, changes: Mapping[int, Optional[Dict[str, Any]]]) -> Tuple[
+            TodoSnapshot, List[int]]:
+        """
+        Apply row changes made to an earlier snapshot to the latest version.
+
+        Each changed todo is looked up in the latest version by its user fields
+        (task, completed, tags), so todos added, deleted or re-scored by other
+        sessions in the meantime are kept. Only the fields the change actually
+        modified are written. A change is a conflict if its todo was edited or
+        deleted by another session; conflicting changes are not applied.
+
+        Args:
+            base: The snapshot the changes were made to
+            changes: New todo for each edited row index of base, or None to delete the row
+
+        Returns:
+            Tuple of (current snapshot, row indices of base that conflicted)
+        """
+        with self._lock:
+            todos = thaw_todos(self._snapshot.todos)
+            originals = thaw_todos(base.todos)
+            taken: Set[int] = set()
+            deleted: Set[int] = set()
+            conflicts = []
+
+            for row_index, changed_todo in sorted(changes.items()):
+                original = originals[row_index]
+                position = _find_todo(todos, original, row_index, taken)
+                if position is None:
+                    conflicts.append(row_index)
+                    continue
+
+                taken.add(position)
+                if changed_todo is None:
+                    deleted.add(position)
+                else:
+                    todos[position].update(
+                        {name: value for name, value in changed_todo.items() if original.get(name) != value})
+
+            if conflicts:
+                logger.warning(f"{len(conflicts)} changes based on version {base.version} conflict with "
+                               f"version {self._snapshot.version}")
+            if len(conflicts) == len(changes):
+                # Nothing to write
+                return self._snapshot, conflicts
+
+            todos = [todo for position, todo in enumerate(todos) if position not in deleted]
+            return self._publish(todos), conflicts
+
+    def _publish(self, todos: List[Dict[str, Any]]) -> TodoSnapshot:
+        """Persist a todo list and make it the current snapshot. Caller holds the lock."""
+        save_todos(todos)
+        self._snapshot = TodoSnapshot(version=self._snapshot.version + 1, todos=_freeze(todos))
+        return self._snapshot
+
+
+# The store shared by all sessions of this process, created on first use
+_shared_store: Optional[TodoStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store() -> TodoStore:
+    """
+    Get the todo store shared by all sessions of this process, loading it on first use.
+
+    Returns:
+        The process-wide todo store
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = TodoStore()
+        return _shared_store
+
+
+def set_shared_store(store: TodoStore) -> None:
+    """
+    Make a given store the one shared by all sessions, e.g. to run the app against test data.
+
+    Args:
+        store: The todo store to share
+    """
+    global _shared_store
+    with _shared_store_lock:
+        _shared_store = store